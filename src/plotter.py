@@ -6,7 +6,7 @@ import numpy as np
 import pandas as pd
 from matplotlib.lines import Line2D
 
-from src.scaleup_model import self_shading
+from src.scaleup_model import read_harvest_df, self_shading
 
 plt.style.use(
     "https://raw.githubusercontent.com/allfed/ALLFED-matplotlib-style-sheet/main/ALLFED.mplstyle"
@@ -127,17 +127,7 @@ def plot_scenario_comparison(percent_need, scenario_max_growth_rates_df, locatio
         max_growth_rate_index = scenario_growth["max_growth_rate"].idxmax()
         max_growth_rate_cluster = scenario_growth.loc[max_growth_rate_index, "cluster"]
         # Read in the results for the cluster with the highest growth rate
-        cluster_df = pd.read_csv(
-            "results"
-            + os.sep
-            + location
-            + os.sep
-            + scenario
-            + os.sep
-            + "harvest_df_cluster_"
-            + str(max_growth_rate_cluster)
-            + ".csv"
-        )
+        cluster_df = read_harvest_df(location, scenario, max_growth_rate_cluster)
         # Calculate the food needed
         food = cluster_df.loc[
             :, ["harvest_for_food", "harvest_intervall", "seaweed_needed_per_day"]
@@ -354,17 +344,7 @@ def create_plots(
         clusters = {}
         for cluster in range(number_of_clusters + 1):
             try:
-                clusters[cluster] = pd.read_csv(
-                    "results"
-                    + os.sep
-                    + location
-                    + os.sep
-                    + scenario
-                    + os.sep
-                    + "harvest_df_cluster_"
-                    + str(cluster)
-                    + ".csv"
-                )
+                clusters[cluster] = read_harvest_df(location, scenario, cluster)
                 print(
                     "Reading in results for cluster "
                     + str(cluster)
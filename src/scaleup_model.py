@@ -1,11 +1,21 @@
 """
 Model to calculate the time it takes to scale-up global seaweed production
 """
+import logging
 import math
-import os
+import multiprocessing
+from pathlib import Path
 
+import numba
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from joblib import Parallel, delayed
+from numba import types
+from numba.extending import overload
+
+log = logging.getLogger(__name__)
 
 
 class SeaweedScaleUpModel:
@@ -26,23 +36,31 @@ class SeaweedScaleUpModel:
         """
         self.seaweed_need = seaweed_need
         self.harvest_loss = harvest_loss
+        # make it a fraction
+        self._harvest_loss_fraction = harvest_loss / 100
+        assert self._harvest_loss_fraction <= 1 and self._harvest_loss_fraction >= 0
         self.load_growth_timeseries(path, cluster)
 
     def load_growth_timeseries(self, path, cluster):
         """
         Loads the growth timeseries from the file
         Arguments:
-            path: the path to the timeseries
+            path: the path to the timeseries (str or Path)
             cluster: the cluster to use
         Returns:
             None
         """
-        growth_timeseries = pd.read_csv(
-            path + os.sep + "actual_growth_rate_by_cluster.csv"
+        column = "growth_daily_cluster_" + str(cluster)
+        # Only parse the column of the cluster we need, with the multithreaded
+        # parser of pyarrow, which is much faster than the one of pandas
+        growth_timeseries = pacsv.read_csv(
+            Path(path) / "actual_growth_rate_by_cluster.csv",
+            convert_options=pacsv.ConvertOptions(
+                include_columns=[column], column_types={column: pa.float64()}
+            ),
         )
-        self.growth_timeseries = growth_timeseries[
-            "growth_daily_cluster_" + str(cluster)
-        ].to_list()
+        # Copy into a writeable array, the zero-copy view of pyarrow is read-only
+        self.growth_timeseries = growth_timeseries.column(column).to_numpy().copy()
 
     def seaweed_growth(
         self,
@@ -73,144 +91,147 @@ class SeaweedScaleUpModel:
             max_density: The maximum density in t/km²
             max_area: The maximum area in km²
             optimal_growth_rate: The optimal growth rate in %
-            growth_rate_fraction: The fraction of the growth rate (can either be scalar or list)
+            growth_rate_fraction: The fraction of the growth rate (scalar or array-like)
             initial_lag: The initial lag in days
             percent_usable_for_growth: The percent usable for growth in %
             days_to_run: The number of days to run
+            verbose: Log every harvest at debug level
+            calibration_run: Don't log when the maximum area is reached
         Returns:
-            A dataframe with all important growth numbers
+            A dataframe with all important growth numbers (as float32)
         """
-        # Initialize
-        current_area_built = initial_area_built
-        current_area_used = initial_area_used
-        current_seaweed = initial_seaweed
-        current_density = current_seaweed / current_area_used
-        track_max_area = False
-
-        cumulative_harvest_for_food = 0
-        current_seaweed_need = 0
-        harvest_intervall = 0
-        # collect all the harvest_intervall values to find the most common at the end
-        harvest_intervall_all = []
-        df = pd.DataFrame(index=range(days_to_run))
-        for current_day in range(days_to_run):
-            # Calculate the area that can be built on that day
-            # Check if it is larger than 0, because this means that
-            # the model is running to estimate the productivity on a fixed area
-            if new_module_area_per_day > 0:
-                new_module_area_per_day = seaweed_farm_area_per_day(current_day)
-            # We can only use a fraction of the module area to grow seaweed
-            growth_area_per_day = new_module_area_per_day * (
-                percent_usable_for_growth / 100
-            )
-            # Skip days that are needed to coordinate production
-            if current_day > initial_lag:
-                # Build more seaweed farms if maximum is not reached
-                if current_area_built < max_area:
-                    df.loc[
-                        current_day, "new_module_area_per_day"
-                    ] = new_module_area_per_day
-                    current_area_built += growth_area_per_day
-                    if current_area_built > max_area:
-                        current_area_built = max_area
-                else:
-                    df.loc[current_day, "new_module_area_per_day"] = 0
-                    if not track_max_area and not calibration_run:
-                        print("max area reached at month ", current_day / 30)
-                        track_max_area = True
-            else:
-                df.loc[current_day, "new_module_area_per_day"] = 0
-            self_shading_factor = self_shading(
-                current_density / 1000
-            )  # convert to kg/m² from t/km2
-            # Let the seaweed grow
-            # This can be done with a fixed value for the growth rate fraction
-            # or with a timeseries of the growth rate fraction
-            if isinstance(growth_rate_fraction, float):
-                # Make sure the growth rate fraction is between 0 and 1
-                assert self_shading_factor <= 1 and self_shading_factor >= 0
-                actual_growth_rate = 1 + (
-                    (optimal_growth_rate * growth_rate_fraction * self_shading_factor)
-                    / 100
-                )
-            elif isinstance(growth_rate_fraction, list):
-                # Make sure all the values in the growth rate fraction list are between 0 and 1
-                assert all(
-                    self_shading_factor <= 1 and self_shading_factor >= 0
-                    for self_shading_factor in growth_rate_fraction
-                )
-                actual_growth_rate = 1 + (
-                    (
-                        optimal_growth_rate
-                        * growth_rate_fraction[current_day]
-                        * self_shading_factor
+        outputs, _, _ = self._run_simulation(
+            initial_seaweed,
+            initial_area_built,
+            initial_area_used,
+            new_module_area_per_day,
+            min_density,
+            max_density,
+            max_area,
+            optimal_growth_rate,
+            growth_rate_fraction,
+            initial_lag,
+            percent_usable_for_growth,
+            days_to_run,
+            calibration_run,
+        )
+        df = pd.DataFrame(dict(zip(SIMULATED_COLUMNS, outputs)))
+        if verbose and log.isEnabledFor(logging.DEBUG):
+            harvests = df.dropna(subset=["harvest_intervall"])
+            for current_day, harvest in harvests.iterrows():
+                log.debug("harvesting at day %s", current_day)
+                log.debug("days since last harvest: %s", harvest["harvest_intervall"])
+                log.debug("harvest_wet %s", harvest["harvest_wet"])
+        # Derive the columns that only change on harvest days from the
+        # harvest values, instead of tracking them every day in the simulation.
+        # _simulate keeps harvest_for_food, new_area_used and current_seaweed in
+        # float64, so the sums and the density are only rounded once, when the
+        # results are cast to float32
+        harvest_for_food = np.nan_to_num(df["harvest_for_food"].to_numpy())
+        new_area_used = np.nan_to_num(df["new_area_used"].to_numpy())
+        cumulative_harvest_for_food = np.cumsum(harvest_for_food)
+        # Prepend the initial area, so the sum is accumulated in the same order
+        # as adding the new area day by day
+        current_area_used = np.cumsum(
+            np.concatenate(([float(initial_area_used)], new_area_used))
+        )[1:]
+        # The density is recorded before harvesting, on all other days
+        # it is the density of the current seaweed
+        current_density = df["current_density"].to_numpy()
+        current_density = np.where(
+            np.isnan(current_density),
+            df["current_seaweed"].to_numpy() / current_area_used,
+            current_density,
+        )
+        df = df.assign(
+            current_seaweed=df["current_seaweed"].astype(np.float32),
+            harvest_for_food=df["harvest_for_food"].astype(np.float32),
+            new_area_used=df["new_area_used"].astype(np.float32),
+            current_seaweed_need=df["current_seaweed_need"].ffill().fillna(0),
+            current_area_used=current_area_used.astype(np.float32),
+            current_density=current_density.astype(np.float32),
+            cumulative_harvest_for_food=cumulative_harvest_for_food.astype(np.float32),
+        )
+        return df
+
+    def _run_simulation(
+        self,
+        initial_seaweed,
+        initial_area_built,
+        initial_area_used,
+        new_module_area_per_day,
+        min_density,
+        max_density,
+        max_area,
+        optimal_growth_rate,
+        growth_rate_fraction,
+        initial_lag,
+        percent_usable_for_growth,
+        days_to_run,
+        calibration_run,
+    ):
+        """
+        Prepares the inputs for _simulate and runs it
+        Arguments:
+            see seaweed_growth
+        Returns:
+            list of arrays with the daily values, in the order of SIMULATED_COLUMNS,
+            the last harvest intervall and the last harvest for food
+            (both NaN if there was none)
+        """
+        # Convert the growth rate fraction to either a float or an array of floats.
+        # numba compiles a separate simulation for each, so a constant growth rate
+        # fraction does not have to be looked up every day
+        if np.isscalar(growth_rate_fraction):
+            growth_rate_fraction = float(growth_rate_fraction)
+        else:
+            growth_rate_fraction = np.asarray(growth_rate_fraction, dtype=np.float64)
+            # The compiled simulation does not check bounds, so make sure
+            # there is a value for every day
+            if len(growth_rate_fraction) < days_to_run:
+                raise IndexError(
+                    "growth_rate_fraction has {} values, but days_to_run is {}".format(
+                        len(growth_rate_fraction), days_to_run
                     )
-                    / 100
                 )
-            else:
-                raise TypeError("growth_rate_fraction must be float or list")
-            # Make sure the actual growth rate is in a reasonable range
-            df.loc[current_day, "actual_growth_rate_multiplicator"] = actual_growth_rate
-            assert actual_growth_rate <= 2 and actual_growth_rate >= 0
-            current_seaweed = current_seaweed * actual_growth_rate
-            # Calculate the seaweed density, so we know when to harvest
-            current_density = current_seaweed / current_area_used
-            # Check if we have reached harvest density
-            if current_density >= max_density:
-                if verbose:
-                    print("harvesting at day ", current_day)
-                    print("days since last harvest: ", harvest_intervall)
-                # Saving the harvest intervall
-                df.loc[current_day, "harvest_intervall"] = harvest_intervall
-                harvest_intervall_all.append(harvest_intervall)
-                # Reset the intervall, as we just have harvested
-                harvest_intervall = 0
-                # calculate the amount of seaweed we have to leave in the field
-                seaweed_remaining_to_grow = current_area_used * min_density
-                df.loc[
-                    current_day, "seaweed_remaining_to_grow"
-                ] = seaweed_remaining_to_grow
-                # calulate the amount harvested
-                harvest_wet = current_seaweed - seaweed_remaining_to_grow
-                df.loc[current_day, "harvest_wet"] = harvest_wet
-                if verbose:
-                    print("harvest_wet", harvest_wet)
-                # calculate harvest loss
-                # make it a fraction
-                harvest_loss = self.harvest_loss / 100
-                assert harvest_loss <= 1 and harvest_loss >= 0
-                harvest_wet_with_loss = harvest_wet * (1 - harvest_loss)
-                df.loc[current_day, "harvest_wet_with_loss"] = harvest_wet_with_loss
-                # calculate how much seaweed we would need to stock all aready built area
-                current_seaweed_need = (
-                    current_area_built - current_area_used
-                ) * min_density
-                # check if we can stock all the area built
-                if current_seaweed_need > harvest_wet_with_loss:
-                    new_area_used = current_seaweed_need / min_density
-                    current_area_used += new_area_used
-                    current_seaweed = seaweed_remaining_to_grow + harvest_wet_with_loss
-                else:
-                    harvest_for_food = harvest_wet_with_loss - current_seaweed_need
-                    df.loc[current_day, "harvest_for_food"] = harvest_for_food
-                    cumulative_harvest_for_food += harvest_for_food
-                    new_area_used = current_seaweed_need / min_density
-                    # calculate the new amount of current seaweed with the
-                    # newly stocked area
-                    current_area_used += new_area_used
-                    current_seaweed = current_area_used * min_density
-                df.loc[current_day, "new_area_used"] = new_area_used
-            # Increment the harvest counter
-            harvest_intervall += 1
-            df.loc[current_day, "current_seaweed_need"] = current_seaweed_need
-            df.loc[current_day, "current_area_built"] = current_area_built
-            df.loc[current_day, "current_area_used"] = current_area_used
-            df.loc[current_day, "current_seaweed"] = current_seaweed
-            df.loc[current_day, "current_density"] = current_density
-            df.loc[
-                current_day, "cumulative_harvest_for_food"
-            ] = cumulative_harvest_for_food
-        return df
+        # Make sure all the values in the growth rate fraction are between 0 and 1
+        assert np.all((growth_rate_fraction >= 0) & (growth_rate_fraction <= 1))
+        # Calculate the area that can be built on each day
+        # Check if it is larger than 0, because this means that
+        # the model is running to estimate the productivity on a fixed area
+        if new_module_area_per_day > 0:
+            # Calculate all days at once, as this is a single vectorized operation
+            new_module_area_schedule = seaweed_farm_area_per_day(
+                np.arange(days_to_run, dtype=np.float64)
+            )
+        else:
+            new_module_area_schedule = np.full(
+                days_to_run, float(new_module_area_per_day)
+            )
+        outputs = _simulate(
+            growth_rate_fraction,
+            new_module_area_schedule,
+            float(initial_seaweed),
+            float(initial_area_built),
+            float(initial_area_used),
+            float(min_density),
+            float(max_density),
+            float(max_area),
+            float(optimal_growth_rate),
+            int(initial_lag),
+            float(percent_usable_for_growth),
+            int(days_to_run),
+            float(self._harvest_loss_fraction),
+        )
+        (
+            *outputs,
+            max_area_reached_day,
+            last_harvest_intervall,
+            last_harvest_for_food,
+        ) = outputs
+        if max_area_reached_day >= 0 and not calibration_run:
+            log.info("max area reached at month %s", max_area_reached_day / 30)
+        return outputs, last_harvest_intervall, last_harvest_for_food
 
     def determine_average_productivity(
         self,
@@ -223,7 +244,7 @@ class SeaweedScaleUpModel:
         Let the model run for one km² to determine the productivity
         per area and day and the harvest intervall
         Arguments:
-            growth_rate_fraction: float or list of the growth rate of seaweed
+            growth_rate_fraction: float or array-like of the growth rate of seaweed
             days_to_run: int, number of days to run the model
             percent_usable_for_growth: float, the percentage of the module area
                 that can be used for growth
@@ -231,7 +252,8 @@ class SeaweedScaleUpModel:
         Returns:
             productivity: float, the average productivity per km² and day
         """
-        harvest_df = self.seaweed_growth(
+        # Only the last harvest is needed, so skip building the dataframe
+        _, last_harvest_intervall, last_harvest_for_food = self._run_simulation(
             initial_seaweed=1,
             initial_area_built=1,
             initial_area_used=1,
@@ -247,30 +269,237 @@ class SeaweedScaleUpModel:
             calibration_run=True
         )
         # Get the stabilized values
-        try:
-            stable_harvest_intervall = harvest_df.loc[
-                harvest_df["harvest_intervall"].last_valid_index(), "harvest_intervall"
-            ]
-            stable_harvest_for_food = harvest_df.loc[
-                harvest_df["harvest_for_food"].last_valid_index(), "harvest_for_food"
-            ]
-        except KeyError:
+        if np.isnan(last_harvest_intervall) or np.isnan(last_harvest_for_food):
             stable_harvest_intervall = None
             stable_harvest_for_food = None
-        print("stable_harvest_intervall every {} days".format(
-            stable_harvest_intervall)
-        )
-        print("Stable harvest for food is {} t".format(stable_harvest_for_food))
+        else:
+            stable_harvest_intervall = last_harvest_intervall
+            stable_harvest_for_food = last_harvest_for_food
+        log.info("stable_harvest_intervall every %s days", stable_harvest_intervall)
+        log.info("Stable harvest for food is %s t", stable_harvest_for_food)
         # Calculate productivity per km² per day
         if stable_harvest_intervall is not None and stable_harvest_for_food is not None:
             productivity_day_km2 = stable_harvest_for_food / stable_harvest_intervall
         else:
             productivity_day_km2 = None
-        print("productivity_day_km2", productivity_day_km2)
-        print("This productivity refers to the area that is usable for growth")
+        log.info("productivity_day_km2 %s", productivity_day_km2)
+        log.info("This productivity refers to the area that is usable for growth")
         return productivity_day_km2
 
 
+# The columns returned by _simulate. current_seaweed_need and current_density
+# are only recorded on harvest days, the remaining columns of the dataframe
+# created by SeaweedScaleUpModel.seaweed_growth are derived from these
+SIMULATED_COLUMNS = (
+    "new_module_area_per_day",
+    "actual_growth_rate_multiplicator",
+    "harvest_intervall",
+    "seaweed_remaining_to_grow",
+    "harvest_wet",
+    "harvest_wet_with_loss",
+    "harvest_for_food",
+    "new_area_used",
+    "current_seaweed_need",
+    "current_density",
+    "current_area_built",
+    "current_seaweed",
+)
+
+
+def _growth_rate_fraction_on_day(growth_rate_fraction, day):
+    """
+    Gets the growth rate fraction of a day
+    Arguments:
+        growth_rate_fraction: the fraction of the growth rate, either constant
+            or an array with one value per day
+        day: the day
+    Returns:
+        the growth rate fraction of that day
+    """
+    if np.isscalar(growth_rate_fraction):
+        return growth_rate_fraction
+    return growth_rate_fraction[day]
+
+
+@overload(_growth_rate_fraction_on_day)
+def _growth_rate_fraction_on_day_jit(growth_rate_fraction, day):
+    """
+    numba version of _growth_rate_fraction_on_day. The type check happens at
+    compile time, so the version of _simulate for a constant growth rate
+    fraction contains no lookup at all
+    """
+    if isinstance(growth_rate_fraction, types.Float):
+        return lambda growth_rate_fraction, day: growth_rate_fraction
+    return lambda growth_rate_fraction, day: growth_rate_fraction[day]
+
+
+@numba.njit(cache=True)
+def _simulate(
+    growth_rate_fraction,
+    new_module_area_schedule,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+    harvest_loss,
+):
+    """
+    Runs the day by day seaweed growth simulation. Compiled with numba,
+    as this loop is where the model spends most of its time
+    Arguments:
+        growth_rate_fraction: the fraction of the growth rate, either constant
+            or an array with one value per day
+        new_module_area_schedule: array with the area built per day in km²
+        harvest_loss: the fraction of the harvest that is lost
+        all other arguments: see SeaweedScaleUpModel.seaweed_growth
+    Returns:
+        tuple of arrays with the daily values, in the order of SIMULATED_COLUMNS,
+        followed by the day the maximum area was reached (-1 if never),
+        the last harvest intervall and the last harvest for food
+        (both NaN if there was none)
+    """
+    # Collect the daily values in preallocated arrays. They are stored as
+    # float32, which is precise enough for the results and halves their size,
+    # while the state of the simulation itself is kept in float64. The current
+    # seaweed, the harvest for food and the new area used are kept in float64
+    # as well, as the density and the cumulative columns are derived from
+    # them afterwards
+    # These are written on every day, so they don't have to be filled beforehand
+    new_module_area_per_day_daily = np.empty(days_to_run, dtype=np.float32)
+    actual_growth_rate_daily = np.empty(days_to_run, dtype=np.float32)
+    current_area_built_daily = np.empty(days_to_run, dtype=np.float32)
+    current_seaweed_daily = np.empty(days_to_run)
+    # These are only written on harvest days and stay NaN otherwise
+    harvest_intervall_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    seaweed_remaining_to_grow_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    harvest_wet_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    harvest_wet_with_loss_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    harvest_for_food_daily = np.full(days_to_run, np.nan)
+    new_area_used_daily = np.full(days_to_run, np.nan)
+    current_seaweed_need_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    current_density_daily = np.full(days_to_run, np.nan, dtype=np.float32)
+    # Initialize
+    current_area_built = initial_area_built
+    current_area_used = initial_area_used
+    current_seaweed = initial_seaweed
+    current_density = current_seaweed / current_area_used
+    max_area_reached_day = -1
+
+    harvest_intervall = 0
+    # collect all the harvest_intervall values to find the most common at the end
+    # there can be at most one harvest per day, so this is the upper bound
+    harvest_intervall_all = np.empty(days_to_run, dtype=np.int32)
+    number_of_harvests = 0
+    last_harvest_for_food = np.nan
+    for current_day in range(days_to_run):
+        new_module_area_per_day = new_module_area_schedule[current_day]
+        # We can only use a fraction of the module area to grow seaweed
+        growth_area_per_day = new_module_area_per_day * (
+            percent_usable_for_growth / 100
+        )
+        # The module area that is actually built on this day
+        module_area_built = 0.0
+        # Skip days that are needed to coordinate production
+        if current_day > initial_lag:
+            # Build more seaweed farms if maximum is not reached
+            if current_area_built < max_area:
+                module_area_built = new_module_area_per_day
+                current_area_built += growth_area_per_day
+                if current_area_built > max_area:
+                    current_area_built = max_area
+            elif max_area_reached_day < 0:
+                max_area_reached_day = current_day
+        self_shading_factor = self_shading_from_table_t_km2(current_density)
+        assert self_shading_factor <= 1 and self_shading_factor >= 0
+        # Let the seaweed grow
+        actual_growth_rate = 1 + (
+            (
+                optimal_growth_rate
+                * _growth_rate_fraction_on_day(growth_rate_fraction, current_day)
+                * self_shading_factor
+            )
+            / 100
+        )
+        # Make sure the actual growth rate is in a reasonable range
+        assert actual_growth_rate <= 2 and actual_growth_rate >= 0
+        current_seaweed = current_seaweed * actual_growth_rate
+        # Calculate the seaweed density, so we know when to harvest
+        current_density = current_seaweed / current_area_used
+        # Check if we have reached harvest density
+        if current_density >= max_density:
+            # Saving the harvest intervall
+            harvest_intervall_daily[current_day] = harvest_intervall
+            current_density_daily[current_day] = current_density
+            harvest_intervall_all[number_of_harvests] = harvest_intervall
+            number_of_harvests += 1
+            # Reset the intervall, as we just have harvested
+            harvest_intervall = 0
+            # calculate the amount of seaweed we have to leave in the field
+            seaweed_remaining_to_grow = current_area_used * min_density
+            seaweed_remaining_to_grow_daily[current_day] = seaweed_remaining_to_grow
+            # calulate the amount harvested
+            harvest_wet = current_seaweed - seaweed_remaining_to_grow
+            harvest_wet_daily[current_day] = harvest_wet
+            # calculate harvest loss
+            harvest_wet_with_loss = harvest_wet * (1 - harvest_loss)
+            harvest_wet_with_loss_daily[current_day] = harvest_wet_with_loss
+            # calculate how much seaweed we would need to stock all aready built area
+            current_seaweed_need = (
+                current_area_built - current_area_used
+            ) * min_density
+            current_seaweed_need_daily[current_day] = current_seaweed_need
+            # check if we can stock all the area built
+            if current_seaweed_need > harvest_wet_with_loss:
+                new_area_used = current_seaweed_need / min_density
+                current_area_used += new_area_used
+                current_seaweed = seaweed_remaining_to_grow + harvest_wet_with_loss
+            else:
+                harvest_for_food = harvest_wet_with_loss - current_seaweed_need
+                harvest_for_food_daily[current_day] = harvest_for_food
+                last_harvest_for_food = harvest_for_food
+                new_area_used = current_seaweed_need / min_density
+                # calculate the new amount of current seaweed with the
+                # newly stocked area
+                current_area_used += new_area_used
+                current_seaweed = current_area_used * min_density
+            new_area_used_daily[current_day] = new_area_used
+        # Increment the harvest counter
+        harvest_intervall += 1
+        # Record the values that change every day together in one place
+        new_module_area_per_day_daily[current_day] = module_area_built
+        actual_growth_rate_daily[current_day] = actual_growth_rate
+        current_area_built_daily[current_day] = current_area_built
+        current_seaweed_daily[current_day] = current_seaweed
+    if number_of_harvests > 0:
+        last_harvest_intervall = float(harvest_intervall_all[number_of_harvests - 1])
+    else:
+        last_harvest_intervall = np.nan
+    return (
+        new_module_area_per_day_daily,
+        actual_growth_rate_daily,
+        harvest_intervall_daily,
+        seaweed_remaining_to_grow_daily,
+        harvest_wet_daily,
+        harvest_wet_with_loss_daily,
+        harvest_for_food_daily,
+        new_area_used_daily,
+        current_seaweed_need_daily,
+        current_density_daily,
+        current_area_built_daily,
+        current_seaweed_daily,
+        max_area_reached_day,
+        last_harvest_intervall,
+        last_harvest_for_food,
+    )
+
+
+@numba.njit(cache=True)
 def self_shading(density):
     """
     Calculates how much the growth rate is reduced due to self shading.
@@ -285,11 +514,83 @@ def self_shading(density):
     """
     assert density > 0
     if density < 0.4:  # kg/m²
-        return 1
+        return 1.0
     else:
         return math.exp(-0.513 * (density - 0.4))
 
 
+# Densities in kg/m² covered by the self shading lookup table. The step size
+# of 0.0025 kg/m² puts the kink of self_shading at 0.4 kg/m² on a grid point
+SELF_SHADING_TABLE_MAX_DENSITY = 10.24
+SELF_SHADING_TABLE_SIZE = 4097
+_self_shading_densities = np.linspace(
+    0, SELF_SHADING_TABLE_MAX_DENSITY, SELF_SHADING_TABLE_SIZE
+)
+# Same curve as self_shading, evaluated for the whole table at once
+SELF_SHADING_TABLE = np.where(
+    _self_shading_densities < 0.4,
+    1.0,
+    np.exp(-0.513 * (_self_shading_densities - 0.4)),
+)
+# Table positions per kg/m² and per t/km² of density
+SELF_SHADING_TABLE_SCALE = (SELF_SHADING_TABLE_SIZE - 1) / SELF_SHADING_TABLE_MAX_DENSITY
+SELF_SHADING_TABLE_SCALE_T_KM2 = (SELF_SHADING_TABLE_SIZE - 1) / (
+    SELF_SHADING_TABLE_MAX_DENSITY * 1000
+)
+
+
+@numba.njit(cache=True)
+def _interpolate_self_shading_table(position):
+    """
+    Linearly interpolates the self shading table
+    Arguments:
+        position: the position in the table, smaller than SELF_SHADING_TABLE_SIZE - 1
+    Returns:
+        the growth rate fraction
+    """
+    index = int(position)
+    weight = position - index
+    return (1 - weight) * SELF_SHADING_TABLE[index] + weight * SELF_SHADING_TABLE[
+        index + 1
+    ]
+
+
+@numba.njit(cache=True)
+def self_shading_from_table(density):
+    """
+    Same as self_shading, but linearly interpolates a precomputed table
+    instead of evaluating the exponential. Falls back to self_shading
+    for densities beyond the table
+    Arguments:
+        density: the seaweed density in kg/m²
+    Returns:
+        the growth rate fraction
+    """
+    assert density > 0
+    position = density * SELF_SHADING_TABLE_SCALE
+    if position >= SELF_SHADING_TABLE_SIZE - 1:
+        return self_shading(density)
+    return _interpolate_self_shading_table(position)
+
+
+@numba.njit(cache=True)
+def self_shading_from_table_t_km2(density):
+    """
+    Same as self_shading_from_table, but for the density in t/km² used in
+    the simulation. The conversion to kg/m² is part of the table scale,
+    so the lookup needs no division
+    Arguments:
+        density: the seaweed density in t/km²
+    Returns:
+        the growth rate fraction
+    """
+    assert density > 0
+    position = density * SELF_SHADING_TABLE_SCALE_T_KM2
+    if position >= SELF_SHADING_TABLE_SIZE - 1:
+        return self_shading(density / 1000)  # convert to kg/m² from t/km2
+    return _interpolate_self_shading_table(position)
+
+
 def calculate_seaweed_need(
     global_pop,
     calories_per_person_per_day,
@@ -321,24 +622,26 @@ def calculate_seaweed_need(
     return seaweed_needed
 
 
+# The parameter values of the logistic curve (max_L, k, x0, off) based on the fitting in:
+# https://github.com/allfed/Seaweed-Scaleup-Model/blob/main/scripts/Logistic%20Growth.ipynb
+_LOGISTIC_PARAMS = (4.15610385e03, 2.83799528e-02, 1.57630971e02, -4.10270637e01)
+
+
 def seaweed_farm_area_per_day(day):
     """
     Estimates the area that can be built per day
     based on how many days have passed. This is a rough estimate
     based on:
         https://github.com/allfed/Seaweed-Scaleup-Model/blob/main/scripts/Logistic%20Growth.ipynb
+    Pass all days as one array instead of calling this once per day,
+    so the curve is calculated in a single vectorized operation
     Arguments:
-        day: the day
+        day: the day or an array of days
     Returns:
-        the area that can be built per day
+        the area that can be built per day (array if day is an array)
     """
-    # The parameter values based on the fitting
-    max_L = 4.15610385e03
-    k = 2.83799528e-02
-    x0 = 1.57630971e02
-    off = -4.10270637e01
     # Calculate the area that can be built per day
-    area_per_day = logistic_curve(day, max_L, k, x0, off)
+    area_per_day = logistic_curve(day, *_LOGISTIC_PARAMS)
     return area_per_day
 
 
@@ -346,17 +649,192 @@ def logistic_curve(x, max_L, k, x0, off):
     """
     Describes a logistic growth curve
     Arguments:
-        x: value to calculate
+        x: value or array of values to calculate
         max_L: maximum value of the curve
         k: the logistic growth rate
         x0: the sigmoid's midpoint
         off: offset to 0
     Returns
-        float: y value corresponding to x
+        float or array: y value(s) corresponding to x
     """
     return max_L / (1 + np.exp(-k * (x - x0))) + off
 
 
+# The file formats the results of a cluster can be saved in, in the order they are read
+HARVEST_DF_FORMATS = ("parquet", "csv")
+
+
+def harvest_df_path(location, scenario, cluster, output_format):
+    """
+    Gets the path of the results of a cluster
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+        output_format (str): the file format, "parquet" or "csv"
+    Returns:
+        Path: the path to the file
+    """
+    return (
+        Path("results")
+        / location
+        / scenario
+        / ("harvest_df_cluster_" + str(cluster) + "." + output_format)
+    )
+
+
+def save_harvest_df(harvest_df, location, scenario, cluster, output_format="parquet"):
+    """
+    Saves the results of a cluster. Parquet is much faster to write and smaller
+    than csv, csv is kept for easier inspection of the results. Results of the
+    cluster in the other format are removed, so they cannot be read by mistake
+    Arguments:
+        harvest_df (pd.DataFrame): the results of the cluster
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+        output_format (str): the file format, "parquet" or "csv"
+    Returns:
+        None
+    """
+    path = harvest_df_path(location, scenario, cluster, output_format)
+    if output_format == "parquet":
+        harvest_df.to_parquet(path, engine="pyarrow", compression="zstd")
+    elif output_format == "csv":
+        harvest_df.to_csv(path)
+    else:
+        raise ValueError("output_format must be parquet or csv")
+    for other_format in HARVEST_DF_FORMATS:
+        if other_format != output_format:
+            harvest_df_path(location, scenario, cluster, other_format).unlink(
+                missing_ok=True
+            )
+
+
+def read_harvest_df(location, scenario, cluster):
+    """
+    Reads the results of a cluster, in whichever format they were saved
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+    Returns:
+        pd.DataFrame: the results of the cluster
+    """
+    for output_format in HARVEST_DF_FORMATS:
+        path = harvest_df_path(location, scenario, cluster, output_format)
+        if path.exists():
+            if output_format == "parquet":
+                return pd.read_parquet(path, engine="pyarrow")
+            return pd.read_csv(path)
+    raise FileNotFoundError("No results for cluster " + str(cluster))
+
+
+def configure_worker_logging(log_level):
+    """
+    Sets up logging in a worker process of run_model. The workers don't inherit
+    the logging configuration of the calling process and are reused between
+    runs, so the level is set again on every call. Does nothing in the calling
+    process itself, so the logging configuration of the user is left alone
+    Arguments:
+        log_level (int): the logging level of the calling process
+    Returns:
+        None
+    """
+    if multiprocessing.parent_process() is None:
+        return
+    # Only adds a handler if there is none yet
+    logging.basicConfig()
+    logging.getLogger().setLevel(log_level)
+
+
+def run_cluster(
+    optimal_growth_rate,
+    days_to_run,
+    harvest_loss,
+    seaweed_needed,
+    percent_usable_for_growth,
+    scenario,
+    location,
+    cluster,
+    output_format="parquet",
+    log_level=None,
+):
+    """
+    Run the model for a single cluster of a scenario and save the results
+    Arguments:
+        optimal_growth_rate (float): the optimal growth rate
+        days_to_run (int): the number of days to run the model
+        harvest_loss (float): Fraction of harvest lost
+        seaweed_needed (float): the amount of seaweed needed per day
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        scenario (str): the scenario to run
+        location (str): location on the globe
+        cluster (int): the cluster to run
+        output_format (str): the file format of the results, "parquet" or "csv"
+        log_level (int): the logging level to use if the cluster runs in a
+            worker process of run_model, see configure_worker_logging
+    Returns:
+        tuple: the scenario, the cluster and its mean growth rate
+    """
+    if log_level is not None:
+        configure_worker_logging(log_level)
+    log.info("Running cluster %s of scenario %s", cluster, scenario)
+    # Initialize the model
+    path = Path("data") / location / scenario
+    model = SeaweedScaleUpModel(path, cluster, seaweed_needed, harvest_loss)
+    growth_rate_fraction = np.mean(model.growth_timeseries)
+    log.info(
+        "Cluster %s: mean growth rate of %s percent per day before self shading",
+        cluster,
+        round(growth_rate_fraction * 30, 2),
+    )
+    # calculate how much area we need to satisfy the daily
+    # seaweed need with the given productivity
+    productivity_day_km2 = model.determine_average_productivity(
+        growth_rate_fraction,
+        500,  # days to calibrate run (has to be longer than time needed to saturate farms)
+        percent_usable_for_growth,
+        optimal_growth_rate,
+    )
+    # check if the area is even productive enough to be used
+    if productivity_day_km2 is not None:
+        log.info("calculating yield for cluster %s", cluster)
+        max_area = seaweed_needed / productivity_day_km2
+        harvest_df = model.seaweed_growth(
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=1200,
+            max_density=3600,
+            max_area=max_area,
+            optimal_growth_rate=optimal_growth_rate,
+            growth_rate_fraction=model.growth_timeseries,
+            initial_lag=0,  # 0 because this is taken care of with the logistic growth
+            percent_usable_for_growth=percent_usable_for_growth,
+            days_to_run=days_to_run,
+        )
+        # The productivity assumes that the whole area is used for growth
+        # but we can only use a fraction of it. Therefore, we have to multiply
+        # the productivity by the fraction of the area that is usable for growth
+        log.info(
+            "The complete area is %s km²",
+            round(max_area / (percent_usable_for_growth / 100), 0),
+        )
+        harvest_df["max_area"] = max_area / (percent_usable_for_growth / 100)
+        harvest_df["cluster"] = cluster
+        harvest_df["seaweed_needed_per_day"] = seaweed_needed
+        save_harvest_df(harvest_df, location, scenario, cluster, output_format)
+    else:
+        log.info(
+            "Not enough productivity in cluster for production %s, skipping it",
+            cluster,
+        )
+    log.info("done with cluster %s of scenario %s", cluster, scenario)
+    return scenario, cluster, growth_rate_fraction
+
+
 def run_model(
     optimal_growth_rate,
     days_to_run,
@@ -372,6 +850,8 @@ def run_model(
     scenarios,
     location,
     number_of_clusters,
+    n_jobs=-1,
+    output_format="parquet",
 ):
     """
     Run the model
@@ -390,9 +870,13 @@ def run_model(
         scenarios (list): list of scenarios to run
         location (str): location on the globe
         number_of_clusters (int): number of clusters
+        n_jobs (int): number of processes to run the clusters in, -1 uses all cores
+        output_format (str): the file format of the results per cluster, "parquet" or "csv"
     Returns:
         None
     """
+    if output_format not in HARVEST_DF_FORMATS:
+        raise ValueError("output_format must be parquet or csv")
     # Fraction of max calories we want in seaweed
     seaweed_limit = feed_limit + food_limit + biofuel_limit
     # Calculate the seaweed needed per day to feed everyone, given the iodine limit
@@ -403,80 +887,28 @@ def run_model(
         calories_per_t_seaweed_wet,
         seaweed_limit,
     )
-    # Save the results for each scenario
-    scenario_max_growth_rates = []
-    # Run for all scenarios
-    for scenario in scenarios:
-        print("Running scenario {}".format(scenario))
-        # Initialize the model
-        for cluster in range(1, number_of_clusters + 1):
-            path = "data" + os.sep + location + os.sep + scenario
-            model = SeaweedScaleUpModel(path, cluster, seaweed_needed, harvest_loss)
-            growth_rate_fraction = np.mean(model.growth_timeseries)
-            print(
-                "Cluster {}: mean growth rate of {} percent per day before self shading".format(
-                    cluster, round(growth_rate_fraction * 30, 2)
-                )
-            )
-            scenario_max_growth_rates.append((scenario, cluster, growth_rate_fraction))
-            # calculate how much area we need to satisfy the daily
-            # seaweed need with the given productivity
-            productivity_day_km2 = model.determine_average_productivity(
-                growth_rate_fraction,
-                500,  # days to calibrate run (has to be longer than time needed to saturate farms)
-                percent_usable_for_growth,
-                optimal_growth_rate,
-            )
-            # check if the area is even productive enough to be used
-            if productivity_day_km2 is not None:
-                print("calculating yield for cluster {}".format(cluster))
-                max_area = seaweed_needed / productivity_day_km2
-                harvest_df = model.seaweed_growth(
-                    initial_seaweed=10000,
-                    initial_area_built=100,
-                    initial_area_used=100,
-                    new_module_area_per_day=100,
-                    min_density=1200,
-                    max_density=3600,
-                    max_area=max_area,
-                    optimal_growth_rate=optimal_growth_rate,
-                    growth_rate_fraction=model.growth_timeseries,
-                    initial_lag=0,  # 0 because this is taken care of with the logistic growth
-                    percent_usable_for_growth=percent_usable_for_growth,
-                    days_to_run=days_to_run,
-                )
-                # The productivity assumes that the whole area is used for growth
-                # but we can only use a fraction of it. Therefore, we have to multiply
-                # the productivity by the fraction of the area that is usable for growth
-                print("The complete area is {} km²".format(
-                    round(max_area / (percent_usable_for_growth / 100), 0))
-                )
-                harvest_df["max_area"] = max_area / (percent_usable_for_growth / 100)
-                harvest_df["cluster"] = cluster
-                harvest_df["seaweed_needed_per_day"] = seaweed_needed
-                harvest_df.to_csv(
-                    "results"
-                    + os.sep
-                    + location
-                    + os.sep
-                    + scenario
-                    + os.sep
-                    + "harvest_df_cluster_"
-                    + str(cluster)
-                    + ".csv"
-                )
-            else:
-                print(
-                    "Not enough productivity in cluster for production {}, skipping it".format(
-                        cluster
-                    )
-                )
-            print("done with cluster\n")
-        print("done with scenario\n\n")
+    # Run all clusters of all scenarios and save the results for each scenario
+    # They are independent of each other, so they can run in parallel
+    scenario_max_growth_rates = Parallel(n_jobs=n_jobs)(
+        delayed(run_cluster)(
+            optimal_growth_rate,
+            days_to_run,
+            harvest_loss,
+            seaweed_needed,
+            percent_usable_for_growth,
+            scenario,
+            location,
+            cluster,
+            output_format,
+            log.getEffectiveLevel(),
+        )
+        for scenario in scenarios
+        for cluster in range(1, number_of_clusters + 1)
+    )
     # Convert the results to a dataframe
     scenario_max_growth_rates_df = pd.DataFrame(
         scenario_max_growth_rates, columns=["scenario", "cluster", "max_growth_rate"]
     )
     scenario_max_growth_rates_df.to_csv(
-        "results" + os.sep + location + os.sep + "scenario_max_growth_rates.csv"
+        Path("results") / location / "scenario_max_growth_rates.csv"
     )
@@ -1,11 +1,23 @@
 """
 Tests the upscaling model.
 """
+import logging
 import os
+import numpy as np
 import pandas as pd
 import pytest
 
-from src.scaleup_model import SeaweedScaleUpModel, self_shading
+from src import scaleup_model
+from src.scaleup_model import (
+    SELF_SHADING_TABLE_MAX_DENSITY,
+    SeaweedScaleUpModel,
+    configure_worker_logging,
+    read_harvest_df,
+    save_harvest_df,
+    self_shading,
+    self_shading_from_table,
+    self_shading_from_table_t_km2,
+)
 
 
 def test_initialize_model():
@@ -18,6 +30,8 @@ def test_initialize_model():
     assert model is not None
     assert model.seaweed_need == 1000
     assert model.harvest_loss == 20
+    assert model.growth_timeseries.dtype == np.float64
+    assert model.growth_timeseries.flags.writeable
 
 
 def test_self_shading():
@@ -30,6 +44,37 @@ def test_self_shading():
     assert self_shading(5) == pytest.approx(0.094, 0.01)
 
 
+def test_self_shading_from_table():
+    """
+    Tests if the self shading lookup table matches the exact curve
+    """
+    with pytest.raises(AssertionError):
+        self_shading_from_table(0)
+    # Across the table, including the kink at 0.4 kg/m²
+    densities = np.concatenate(
+        [np.linspace(0.001, SELF_SHADING_TABLE_MAX_DENSITY, 10007), [0.3999, 0.4, 0.4001]]
+    )
+    for density in densities:
+        assert self_shading_from_table(density) == pytest.approx(
+            self_shading(density), rel=1e-6
+        )
+    # Past the table it falls back to the exact curve
+    for density in [SELF_SHADING_TABLE_MAX_DENSITY, 11, 50]:
+        assert self_shading_from_table(density) == self_shading(density)
+
+
+def test_self_shading_from_table_t_km2():
+    """
+    Tests if the self shading lookup in t/km² matches the one in kg/m²
+    """
+    with pytest.raises(AssertionError):
+        self_shading_from_table_t_km2(0)
+    for density in [0.1, 0.4, 0.41, 1.2, 3.6, 7.5, 10.24, 20]:
+        assert self_shading_from_table_t_km2(density * 1000) == pytest.approx(
+            self_shading_from_table(density), rel=1e-12
+        )
+
+
 def test_seaweed_growth():
     """
     Tests if the growth calculations finish correctly
@@ -73,3 +118,112 @@ def test_determine_productivity():
 
     assert productivity_day_km2 is not None
     assert productivity_day_km2 == pytest.approx(94.8, 0.1)
+
+
+def test_growth_rate_fraction_out_of_range(monkeypatch):
+    """
+    Tests if growth rate fractions outside of 0 and 1 are rejected
+    before the simulation starts
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    growth_rate_fraction = list(model.growth_timeseries[:100])
+    growth_rate_fraction[-1] = 1.5
+
+    def fail_simulate(*args):
+        raise RuntimeError("the simulation should not have been started")
+
+    monkeypatch.setattr(scaleup_model, "_simulate", fail_simulate)
+    with pytest.raises(AssertionError):
+        model.seaweed_growth(
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=1000,
+            max_density=4000,
+            max_area=250,
+            optimal_growth_rate=60,
+            growth_rate_fraction=growth_rate_fraction,
+            initial_lag=30,
+            percent_usable_for_growth=50,
+            days_to_run=100,
+        )
+
+
+def test_growth_rate_fraction_too_short():
+    """
+    Tests if a growth rate timeseries shorter than the run is rejected
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    with pytest.raises(IndexError):
+        model.seaweed_growth(
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=1000,
+            max_density=4000,
+            max_area=250,
+            optimal_growth_rate=60,
+            growth_rate_fraction=model.growth_timeseries[:100],
+            initial_lag=30,
+            percent_usable_for_growth=50,
+            days_to_run=101,
+        )
+
+
+def test_save_and_read_harvest_df(tmp_path, monkeypatch):
+    """
+    Tests if the results of a cluster can be saved and read in both formats
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "results" / "global" / "150tg").mkdir(parents=True)
+    harvest_df = pd.DataFrame(
+        {"harvest_for_food": [np.nan, 1.5, np.nan], "cluster": [1, 1, 1]}
+    )
+    with pytest.raises(FileNotFoundError):
+        read_harvest_df("global", "150tg", 1)
+    for output_format in ["parquet", "csv"]:
+        save_harvest_df(harvest_df, "global", "150tg", 1, output_format)
+        read_df = read_harvest_df("global", "150tg", 1)
+        pd.testing.assert_frame_equal(
+            read_df[harvest_df.columns], harvest_df, check_dtype=False
+        )
+    # Saving as csv removes the parquet results saved before
+    assert not (
+        tmp_path / "results" / "global" / "150tg" / "harvest_df_cluster_1.parquet"
+    ).exists()
+    with pytest.raises(ValueError):
+        save_harvest_df(harvest_df, "global", "150tg", 1, "xlsx")
+
+
+def test_configure_worker_logging(monkeypatch):
+    """
+    Tests if logging is only set up in worker processes and follows the level
+    of the calling process on every run
+    """
+    root = logging.getLogger()
+    level = root.level
+    monkeypatch.setattr(root, "handlers", [])
+    try:
+        # In the calling process the logging configuration is left alone
+        configure_worker_logging(logging.INFO)
+        assert root.handlers == []
+        assert root.level == level
+        # In a worker process a handler is added and the level is set
+        monkeypatch.setattr(
+            scaleup_model.multiprocessing, "parent_process", lambda: object()
+        )
+        configure_worker_logging(logging.WARNING)
+        assert len(root.handlers) == 1
+        assert root.level == logging.WARNING
+        # A reused worker picks up the new level without adding another handler
+        configure_worker_logging(logging.INFO)
+        assert len(root.handlers) == 1
+        assert root.level == logging.INFO
+    finally:
+        root.setLevel(level)